@@ -1,5 +1,22 @@
-import time, os, shutil, json, argparse, logging
+import time, os, re, sys, copy, fnmatch, shutil, json, argparse, logging
 from pathlib import Path
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+# Prefer orjson's C parser/serializer when it's installed
+# (both produce the same 2-space indented file)
+try:
+    import orjson
+
+    json_loads = orjson.loads
+
+    def json_dumps(obj):
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+except ImportError:
+    json_loads = json.loads
+
+    def json_dumps(obj):
+        return json.dumps(obj, indent=2, ensure_ascii=False).encode('utf-8')
 
 # ===== PLATFORM-INDEPENDENT PATHS =====
 SCRIPT_DIR = Path(__file__).parent.resolve()
@@ -11,21 +28,29 @@ else:  # Linux, MacOS
 CONFIG_FILE = APP_DATA_DIR / "config.json"
 LOG_FILE = APP_DATA_DIR / "tidybot.log"
 
+# Moves are independent syscalls, so a few threads hide filesystem latency
+MAX_MOVE_WORKERS = 8
+
+# Windows and MacOS filesystems are case-insensitive by default
+CASE_INSENSITIVE_FS = os.name == 'nt' or sys.platform == 'darwin'
+
 # ===== SET UP LOGGING FIRST =====
 def setup_logging():
     """Set up logging before anything else runs."""
+    logger = logging.getLogger("TidyBot")
+
+    # Already configured (e.g. module re-imported); reuse the existing handlers
+    if logger.handlers:
+        return logger
+
     try:
         APP_DATA_DIR.mkdir(parents=True, exist_ok=True)
     except Exception as e:
         print(f"Fatal error: Could not create app data directory: {e}")
         exit(1)
     
-    logger = logging.getLogger("TidyBot")
     logger.setLevel(logging.DEBUG)
     
-    # Clear any existing handlers to avoid duplicates
-    logger.handlers.clear()
-    
     file_handler = logging.FileHandler(LOG_FILE)
     file_handler.setLevel(logging.DEBUG)
 
@@ -46,8 +71,8 @@ def setup_logging():
 # Create logger immediately
 logger = setup_logging()
 logger.info("TidyBot started.")
-logger.info(f"Config directory: {APP_DATA_DIR}")
-logger.info(f"Config file: {CONFIG_FILE}")
+logger.info("Config directory: %s", APP_DATA_DIR)
+logger.info("Config file: %s", CONFIG_FILE)
 
 def create_default_config():
     """Creates a default configuration file."""
@@ -129,70 +154,203 @@ def create_default_config():
       ".dmg",
       ".pkg"
     ]
-  }
+  },
+  "ignored_patterns": [
+    ".*",
+    "*.crdownload",
+    "*.part",
+    "*.tmp",
+    "Thumbs.db",
+    "desktop.ini"
+  ]
 }
     return default_config
 
+def expand_downloads_path(config):
+    """Expands downloads_path once, keeping both a Path and a plain string copy."""
+    config["downloads_path"] = Path(config["downloads_path"]).expanduser()
+    config["downloads_path_str"] = os.fspath(config["downloads_path"])
+    return config
+
+def write_config_file(data):
+    """Atomically replaces CONFIG_FILE with data via a synced temp file and os.replace."""
+    tmp_path = CONFIG_FILE.with_suffix('.json.tmp')
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(str(tmp_path), str(CONFIG_FILE))
+    except BaseException:
+        try:
+            os.unlink(str(tmp_path))
+        except OSError:
+            pass
+        raise
+
+# (st_mtime_ns, parsed config) of the last successfully read config file
+_config_cache = None
+
 def load_config():
     """Loads configuration, automatically fixes corrupted files."""
+    global _config_cache
     try:
         APP_DATA_DIR.mkdir(parents=True, exist_ok=True)
         
-        if not CONFIG_FILE.exists():
+        try:
+            mtime = CONFIG_FILE.stat().st_mtime_ns
+        except FileNotFoundError:
             logger.info("No config file found. Creating default configuration.")
             config = create_default_config()
-            config["downloads_path"] = Path(config["downloads_path"]).expanduser()
+            expand_downloads_path(config)
             return config
+
+        # Reuse the parsed config if the file hasn't changed since the last load
+        if _config_cache is not None and _config_cache[0] == mtime:
+            return copy.deepcopy(_config_cache[1])
         
         # Try to read the existing config file
         try:
-            with open(CONFIG_FILE, 'r') as f:
-                config = json.load(f)
-                config["downloads_path"] = Path(config["downloads_path"]).expanduser()
-                return config
+            config = json_loads(CONFIG_FILE.read_bytes())
+            expand_downloads_path(config)
+            _config_cache = (mtime, config)
+            return copy.deepcopy(config)
                 
         except json.JSONDecodeError as e:
             # CONFIG FILE IS CORRUPTED!
-            logger.warning(f"Config file is corrupted: {e}. Creating backup and generating new config.")
+            logger.warning("Config file is corrupted: %s. Creating backup and generating new config.", e)
             
             # Create a backup of the corrupted file
             backup_path = CONFIG_FILE.with_suffix('.json.bak')
             try:
-                shutil.copy2(CONFIG_FILE, backup_path)
-                logger.info(f"Backup of corrupted config saved to: {backup_path}")
+                # The corrupted file is about to be replaced, so move it rather than copy it
+                os.replace(str(CONFIG_FILE), str(backup_path))
+                logger.info("Backup of corrupted config saved to: %s", backup_path)
             except:
                 logger.warning("Could not create backup of corrupted config.")
             
             # Create a fresh default config
             config = create_default_config()
-            config["downloads_path"] = Path(config["downloads_path"]).expanduser()
-            with open(CONFIG_FILE, 'w') as f:
-                json.dump(config, f, indent=4)
+            write_config_file(json_dumps(config))
+            expand_downloads_path(config)
             logger.info("New default config created.")
             return config
             
     except Exception as E:
-        logger.error(f"Unexpected error loading config: {E}", exc_info=True)
+        logger.error("Unexpected error loading config: %s", E, exc_info=True)
         config = create_default_config()
-        config["downloads_path"] = Path(config["downloads_path"]).expanduser()
+        expand_downloads_path(config)
         return config
 
-def get_available_name(destination_path):
-    """Generates a unique filename if destination already exists."""
-    if not destination_path.exists():
+def save_config(config):
+    """Atomically writes a loaded config back to CONFIG_FILE."""
+    config_for_save = config.copy()
+    config_for_save["downloads_path"] = config_for_save.pop("downloads_path_str")
+    write_config_file(json_dumps(config_for_save))
+
+def build_ignore_rules(patterns):
+    """Splits ignore patterns into (prefixes, suffixes, exact names, glob matchers).
+
+    "prefix*" matches names starting with prefix, "*suffix" names ending with
+    suffix, and a name without wildcards must match exactly. Any other
+    pattern (e.g. "*foo*" or "a?c") falls back to an fnmatch-style glob.
+    Patterns that would match every file, like "*", are ignored with a warning.
+    Patterns are normalized with name_key(), so match names normalized the same way.
+    """
+    prefixes, suffixes, names, globs = [], [], set(), []
+    for pattern in patterns:
+        if not pattern:
+            continue
+        pattern = name_key(pattern)
+        if not pattern.strip('*'):
+            logger.warning("Ignoring ignored_patterns entry %r: it would skip every file", pattern)
+            continue
+        if pattern.startswith('*') and not has_wildcards(pattern[1:]):
+            suffixes.append(pattern[1:])
+        elif pattern.endswith('*') and not has_wildcards(pattern[:-1]):
+            prefixes.append(pattern[:-1])
+        elif not has_wildcards(pattern):
+            names.add(pattern)
+        else:
+            globs.append(re.compile(fnmatch.translate(pattern)).match)
+    return tuple(prefixes), tuple(suffixes), names, globs
+
+def has_wildcards(pattern):
+    """Whether a pattern uses any fnmatch wildcard characters."""
+    return '*' in pattern or '?' in pattern or '[' in pattern
+
+def build_ext_index(categories):
+    """Maps each extension to its category; the first category listing it wins."""
+    ext_to_category = {}
+    for category, extensions in categories.items():
+        for ext in extensions:
+            ext_to_category.setdefault(ext.lower(), category)
+    return ext_to_category
+
+def name_key(name):
+    """Normalizes a filename for collision checks on case-insensitive filesystems."""
+    return name.casefold() if CASE_INSENSITIVE_FS else name
+
+def list_existing_names(directory):
+    """Returns the normalized names already present in a directory.
+
+    Returns an empty set if it can't be listed (missing, not a directory,
+    unreadable); moves into it then fail and are reported per file.
+    """
+    try:
+        with os.scandir(directory) as entries:
+            return {name_key(e.name) for e in entries}
+    except OSError:
+        return set()
+
+NUMBERED_STEM = re.compile(r"(.*) \((\d+)\)$")
+
+def index_numbered_names(existing_names):
+    """Maps (stem, suffix) to the highest N among names like "stem (N)suffix"."""
+    last_numbers = {}
+    for existing in existing_names:
+        stem, suffix = os.path.splitext(existing)
+        if not stem.endswith(')'):
+            continue
+        match = NUMBERED_STEM.match(stem)
+        if match:
+            key = (match.group(1), suffix)
+            last_numbers[key] = max(last_numbers.get(key, 0), int(match.group(2)))
+    return last_numbers
+
+def get_available_name(destination_path, existing_names, last_numbers):
+    """Generates a unique filename if destination already exists.
+
+    Checks against the cached existing_names set instead of the filesystem
+    and records the chosen name in it. Collisions are numbered one past the
+    highest existing copy, e.g. "file (3).pdf" when "file (2).pdf" exists.
+    last_numbers is the folder's index_numbered_names() result, kept up to date.
+    """
+    parent_dir, name = os.path.split(destination_path)
+    if name_key(name) not in existing_names:
+        existing_names.add(name_key(name))
         return destination_path
 
-    stem = destination_path.stem
-    suffix = destination_path.suffix
-    parent_dir = destination_path.parent
+    stem, suffix = os.path.splitext(name)
+    key = (name_key(stem), name_key(suffix))
 
-    counter = 1
-    while True:
-        new_name = f"{stem} ({counter}){suffix}"
-        new_path = parent_dir / new_name
-        if not new_path.exists():
-            return new_path
+    # A file moved in under its own name may have taken the next number since
+    counter = last_numbers.get(key, 0) + 1
+    while name_key(f"{stem} ({counter}){suffix}") in existing_names:
         counter += 1
+    last_numbers[key] = counter
+
+    new_name = f"{stem} ({counter}){suffix}"
+    existing_names.add(name_key(new_name))
+    return os.path.join(parent_dir, new_name)
+
+def move_file(source, destination):
+    """Moves a file, using a plain rename when source and destination share a filesystem."""
+    try:
+        os.rename(source, destination)
+    except OSError:
+        # Cross-device or otherwise unsupported rename
+        shutil.move(source, destination)
 
 def sorter(dry_run=False):
     config = load_config()
@@ -202,67 +360,118 @@ def sorter(dry_run=False):
         return
     
     download_path = config['downloads_path']
+    download_path_str = config['downloads_path_str']
+    config_dirty = False
     categories = config['file_categories']
 
     if not download_path.exists():
-        logger.error(f"Downloads path does not exist: {download_path}")
+        logger.error("Downloads path does not exist: %s", download_path)
         return
 
     if not config.get("initialized", False):
         logger.info("First run detected. Creating category folders...")
+        with os.scandir(download_path_str) as entries:
+            existing_dirs = {e.name for e in entries if e.is_dir(follow_symlinks=False)}
         for folder_name in categories.keys():
+            if folder_name in existing_dirs:
+                continue
             if dry_run:
-                logger.info(f"[DRY RUN] Would create '{download_path}/{folder_name}'")
+                logger.info("[DRY RUN] Would create '%s/%s'", download_path, folder_name)
             else:
-                (download_path / folder_name).mkdir(exist_ok=True)
-                logger.info(f"Created folder: {folder_name}")
+                folder_path = os.path.join(download_path_str, folder_name)
+                try:
+                    os.mkdir(folder_path)
+                    logger.info("Created folder: %s", folder_name)
+                except FileExistsError:
+                    # Created since the scan is fine; a file with the category's name is not
+                    if not os.path.isdir(folder_path):
+                        raise
         
         config["initialized"] = True
         
         if not dry_run:
-            try:
-                config_for_save = config.copy()
-                config_for_save["downloads_path"] = str(config["downloads_path"])
-                with open(CONFIG_FILE, 'w') as f:
-                    json.dump(config_for_save, f, indent=4)
-                logger.info("Config updated: initialized = True")
-            except Exception as e:
-                logger.error(f"Error saving config: {e}")
+            # Saved once all files have been moved
+            config_dirty = True
         else:
             logger.info("[DRY RUN] Would set config['initialized'] to True")
 
-    for item in download_path.iterdir():
-        if item.is_file():
-            file_suffix = item.suffix.lower()
-
-            if file_suffix in categories["Archives"]:
-                target_dir = download_path / "Archives"
-            elif file_suffix in categories["Documents"]:
-                target_dir = download_path / "Documents"
-            elif file_suffix in categories["Graphics"]:
-                target_dir = download_path / "Graphics"
-            elif file_suffix in categories["Programs"]:
-                target_dir = download_path / "Programs"
-            else:
-                target_dir = download_path / "Others"
+    ext_to_category = build_ext_index(categories)
+    ignored_patterns = config.get("ignored_patterns")
+    if ignored_patterns is None:
+        ignored_patterns = create_default_config()["ignored_patterns"]
+    ignored_prefixes, ignored_suffixes, ignored_names, ignored_globs = build_ignore_rules(ignored_patterns)
+    target_dirs = {name: os.path.join(download_path_str, name) for name in categories}
+    target_dirs.setdefault("Others", os.path.join(download_path_str, "Others"))
+    existing_names = {name: list_existing_names(path) for name, path in target_dirs.items()}
+    last_numbers = {name: index_numbered_names(names) for name, names in existing_names.items()}
+    moved_per_category = Counter()
+    # Per-file records only go to the DEBUG log; skip them entirely when that's off
+    log_each_move = logger.isEnabledFor(logging.DEBUG)
+    # (name, source, category, original destination, final destination)
+    moves = []
+
+    with os.scandir(download_path_str) as entries:
+        for entry in entries:
+            # Hidden, system and partially-downloaded files stay where they are
+            name = name_key(entry.name)
+            if name.startswith(ignored_prefixes) or name.endswith(ignored_suffixes) or name in ignored_names:
+                continue
+            if ignored_globs and any(match(name) for match in ignored_globs):
+                continue
+            # Never move symlinks: they may point outside the Downloads folder
+            if entry.is_symlink():
+                logger.warning("Skipping symlink: %s", entry.name)
+                continue
+            if not entry.is_file(follow_symlinks=False):
+                continue
+
+            # Dotfiles like ".bashrc" (empty head) and names ending in "." have no suffix
+            head, _, ext = entry.name.rpartition('.')
+            file_suffix = '.' + ext.lower() if head and ext else ''
 
-            original_destination = target_dir / item.name
-            final_destination = get_available_name(original_destination)
+            target_name = ext_to_category.get(file_suffix, "Others")
+            target_dir = target_dirs[target_name]
+            original_destination = target_dir + os.sep + entry.name
+            final_destination = get_available_name(original_destination, existing_names[target_name],
+                                                   last_numbers[target_name])
 
             if dry_run:
                 if original_destination == final_destination:
-                    logger.info(f"[DRY RUN] Would move '{item.name}' to '{target_dir.name}/'")
+                    logger.info("[DRY RUN] Would move '%s' to '%s/'", entry.name, target_name)
                 else:
-                    logger.info(f"[DRY RUN] Would move '{item.name}' to '{target_dir.name}/' as '{final_destination.name}'")
+                    logger.info("[DRY RUN] Would move '%s' to '%s/' as '%s'",
+                                entry.name, target_name, os.path.basename(final_destination))
             else:
-                try:
-                    shutil.move(str(item), str(final_destination))
-                    if original_destination == final_destination:
-                        logger.info(f"Moved: {item.name} -> {target_dir.name}/")
-                    else:
-                        logger.info(f"Moved and renamed: {item.name} -> {target_dir.name}/{final_destination.name}")
-                except Exception as e:
-                    logger.error(f"Error moving {item.name}: {e}")
+                moves.append((entry.name, entry.path, target_name, original_destination, final_destination))
+
+    if dry_run:
+        return
+
+    # Final names are already resolved above, so the moves are independent
+    with ThreadPoolExecutor(max_workers=MAX_MOVE_WORKERS) as executor:
+        futures = [executor.submit(move_file, source, destination)
+                   for _, source, _, _, destination in moves]
+
+    for (name, _, target_name, original_destination, final_destination), future in zip(moves, futures):
+        error = future.exception()
+        if error is not None:
+            logger.error("Error moving %s: %s", name, error)
+            continue
+        moved_per_category[target_name] += 1
+        if log_each_move:
+            if original_destination == final_destination:
+                logger.debug("Moved: %s -> %s/", name, target_name)
+            else:
+                logger.debug("Moved and renamed: %s -> %s/%s", name, target_name, os.path.basename(final_destination))
+
+    logger.info("Moved %d files: %s", sum(moved_per_category.values()), dict(moved_per_category))
+
+    if config_dirty:
+        try:
+            save_config(config)
+            logger.info("Config updated: initialized = True")
+        except Exception as e:
+            logger.error("Error saving config: %s", e)
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Organize your Downloads folder.')
@@ -274,4 +483,4 @@ if __name__ == "__main__":
         sorter(dry_run=args.dry_run)
         logger.info("TidyBot finished successfully.")
     except Exception as E:
-        logger.error(f"TidyBot encountered an error: {E}", exc_info=True)
\ No newline at end of file
+        logger.error("TidyBot encountered an error: %s", E, exc_info=True)
\ No newline at end of file